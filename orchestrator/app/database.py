@@ -1,183 +1,218 @@
-import psycopg
-from psycopg.rows import dict_row
-from contextlib import contextmanager
-from typing import Generator, Optional
-from datetime import datetime
-import json
+import asyncpg
+import orjson
+from typing import Optional
+from uuid import UUID
 
 from app.config import get_settings
 
 
-def get_connection():
-    settings = get_settings()
-    return psycopg.connect(settings.database_url, row_factory=dict_row)
+# Connection pool (created in the FastAPI lifespan)
+pool: Optional[asyncpg.Pool] = None
 
 
-@contextmanager
-def get_db() -> Generator:
-    conn = get_connection()
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode JSONB columns to Python objects, as psycopg did."""
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=lambda value: orjson.dumps(value).decode(),
+        decoder=orjson.loads,
+        schema="pg_catalog",
+    )
 
 
-def init_db():
+async def init_pool() -> asyncpg.Pool:
+    """Create the shared connection pool."""
+    global pool
+    settings = get_settings()
+    pool = await asyncpg.create_pool(
+        settings.database_url,
+        min_size=settings.database_pool_min_size,
+        max_size=settings.database_pool_max_size,
+        # asyncpg prepares every query on first use; the schema never changes
+        # at runtime, so keep those plans for the connection's lifetime
+        max_cached_statement_lifetime=0,
+        init=_init_connection,
+    )
+    return pool
+
+
+async def close_pool():
+    """Close the shared connection pool."""
+    global pool
+    if pool:
+        await pool.close()
+        pool = None
+
+
+async def init_db():
     """Initialize database tables."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS submissions (
-                    id SERIAL PRIMARY KEY,
-                    company_name VARCHAR(255) NOT NULL,
-                    company_url VARCHAR(500) NOT NULL,
-                    email VARCHAR(255) NOT NULL,
-                    job_id UUID UNIQUE NOT NULL,
-                    auth_token UUID UNIQUE NOT NULL,
-                    status VARCHAR(50) NOT NULL DEFAULT 'queued',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP
-                )
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS profiles (
-                    id SERIAL PRIMARY KEY,
-                    submission_id INTEGER REFERENCES submissions(id),
-                    profile_json JSONB NOT NULL,
-                    data_sources_used TEXT[],
-                    confidence_score VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS feedback (
-                    id SERIAL PRIMARY KEY,
-                    profile_id INTEGER REFERENCES profiles(id),
-                    rating INTEGER CHECK (rating >= 1 AND rating <= 5),
-                    comment TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cur.execute("""
-                CREATE INDEX IF NOT EXISTS idx_submissions_job_id ON submissions(job_id)
-            """)
-            cur.execute("""
-                CREATE INDEX IF NOT EXISTS idx_submissions_auth_token ON submissions(auth_token)
-            """)
-            cur.execute("""
-                CREATE INDEX IF NOT EXISTS idx_submissions_company_url ON submissions(company_url)
-            """)
-
-
-def create_submission(
+    async with pool.acquire() as conn:
+        # One simple-protocol script: a single round trip and implicit transaction
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                id SERIAL PRIMARY KEY,
+                company_name VARCHAR(255) NOT NULL,
+                company_url VARCHAR(500) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                job_id UUID UNIQUE NOT NULL,
+                auth_token UUID UNIQUE NOT NULL,
+                status VARCHAR(50) NOT NULL DEFAULT 'queued',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS profiles (
+                id SERIAL PRIMARY KEY,
+                submission_id INTEGER REFERENCES submissions(id),
+                profile_json JSONB NOT NULL,
+                data_sources_used TEXT[],
+                confidence_score VARCHAR(50),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS feedback (
+                id SERIAL PRIMARY KEY,
+                profile_id INTEGER REFERENCES profiles(id),
+                rating INTEGER CHECK (rating >= 1 AND rating <= 5),
+                comment TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_submissions_job_id ON submissions(job_id);
+
+            CREATE INDEX IF NOT EXISTS idx_submissions_auth_token ON submissions(auth_token);
+
+            CREATE INDEX IF NOT EXISTS idx_submissions_url_recent
+            ON submissions(company_url, created_at DESC) WHERE status = 'complete';
+
+            DROP INDEX IF EXISTS idx_submissions_company_url;
+        """)
+
+
+async def create_submission(
     company_name: str,
     company_url: str,
     email: str,
-    job_id: str,
-    auth_token: str,
     status: str = "queued"
-) -> int:
-    """Create a new submission and return its ID."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO submissions (company_name, company_url, email, job_id, auth_token, status)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (company_name, company_url, email, job_id, auth_token, status))
-            result = cur.fetchone()
-            return result["id"]
-
-
-def get_submission_by_job_id(job_id: str) -> Optional[dict]:
+) -> dict:
+    """Create a new submission and return its ID, job ID and auth token."""
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            INSERT INTO submissions (company_name, company_url, email, job_id, auth_token, status)
+            VALUES ($1, $2, $3, gen_random_uuid(), gen_random_uuid(), $4)
+            RETURNING id, job_id, auth_token
+        """, company_name, company_url, email, status)
+        return dict(row)
+
+
+async def get_submission_by_job_id(job_id: UUID) -> Optional[dict]:
     """Get submission by job ID."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT * FROM submissions WHERE job_id = %s
-            """, (job_id,))
-            return cur.fetchone()
-
-
-def get_submission_by_token(token: str) -> Optional[dict]:
-    """Get submission by auth token."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT * FROM submissions WHERE auth_token = %s
-            """, (token,))
-            return cur.fetchone()
-
-
-def get_submission_by_url(url: str) -> Optional[dict]:
-    """Get recent submission by URL (for caching)."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT * FROM submissions
-                WHERE company_url = %s
-                AND status = 'complete'
-                AND created_at > NOW() - INTERVAL '24 hours'
-                ORDER BY created_at DESC
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT * FROM submissions WHERE job_id = $1
+        """, job_id)
+        return dict(row) if row else None
+
+
+async def get_submission_and_profile_by_token(token: UUID) -> Optional[dict]:
+    """Get submission by auth token along with its profile (profile fields are None if missing)."""
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT s.company_name, s.status, s.created_at,
+                   p.id AS profile_id, p.profile_json, p.created_at AS profile_created_at
+            FROM submissions s
+            LEFT JOIN profiles p ON p.submission_id = s.id
+            WHERE s.auth_token = $1
+        """, token)
+        return dict(row) if row else None
+
+
+async def get_profile_text_by_token(token: UUID) -> Optional[dict]:
+    """Like get_submission_and_profile_by_token, but with the profile as raw JSON text."""
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT s.company_name, s.status, s.created_at,
+                   p.profile_json::text AS profile_json_text, p.created_at AS profile_created_at
+            FROM submissions s
+            LEFT JOIN profiles p ON p.submission_id = s.id
+            WHERE s.auth_token = $1
+        """, token)
+        return dict(row) if row else None
+
+
+async def get_or_prepare_submission(job_id: str, url: str, status: str) -> Optional[dict]:
+    """
+    Set a submission's status and look up a cached profile in one round trip.
+
+    Returns the submission ID along with the profile_json, data_sources_used
+    and confidence_score of the latest complete submission for the same URL
+    in the last 24 hours (all None on a cache miss), or None if the job
+    doesn't exist.
+    """
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            WITH current AS (
+                UPDATE submissions SET status = $3 WHERE job_id = $1
+                RETURNING id
+            ), cached AS (
+                SELECT p.profile_json, p.data_sources_used, p.confidence_score
+                FROM submissions s
+                JOIN profiles p ON p.submission_id = s.id
+                WHERE s.company_url = $2
+                AND s.status = 'complete'
+                AND s.created_at > NOW() - INTERVAL '24 hours'
+                ORDER BY s.created_at DESC
                 LIMIT 1
-            """, (url,))
-            return cur.fetchone()
+            )
+            SELECT current.id, cached.profile_json, cached.data_sources_used, cached.confidence_score
+            FROM current LEFT JOIN cached ON TRUE
+        """, job_id, url, status)
+        return dict(row) if row else None
 
 
-def update_submission_status(job_id: str, status: str, completed_at: Optional[datetime] = None):
-    """Update submission status."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            if completed_at:
-                cur.execute("""
-                    UPDATE submissions SET status = %s, completed_at = %s WHERE job_id = %s
-                """, (status, completed_at, job_id))
-            else:
-                cur.execute("""
-                    UPDATE submissions SET status = %s WHERE job_id = %s
-                """, (status, job_id))
+async def update_submission_status_now(job_id: str, status: str):
+    """Update submission status to a terminal state, completed as of now."""
+    async with pool.acquire() as conn:
+        await conn.execute("""
+            UPDATE submissions SET status = $1, completed_at = NOW() WHERE job_id = $2
+        """, status, job_id)
 
 
-def create_profile(
+async def create_profile(
     submission_id: int,
     profile_json: dict,
     data_sources_used: list[str],
     confidence_score: str
 ) -> int:
     """Create a profile and return its ID."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO profiles (submission_id, profile_json, data_sources_used, confidence_score)
-                VALUES (%s, %s, %s, %s)
-                RETURNING id
-            """, (submission_id, json.dumps(profile_json), data_sources_used, confidence_score))
-            result = cur.fetchone()
-            return result["id"]
+    async with pool.acquire() as conn:
+        return await conn.fetchval("""
+            INSERT INTO profiles (submission_id, profile_json, data_sources_used, confidence_score)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id
+        """, submission_id, profile_json, data_sources_used, confidence_score)
 
 
-def get_profile_by_submission_id(submission_id: int) -> Optional[dict]:
-    """Get profile by submission ID."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT * FROM profiles WHERE submission_id = %s
-            """, (submission_id,))
-            return cur.fetchone()
+async def create_profile_for_job(
+    job_id: str,
+    profile_json: dict,
+    data_sources_used: list[str],
+    confidence_score: str
+) -> Optional[int]:
+    """Create a profile for the submission with the given job ID and return its ID."""
+    async with pool.acquire() as conn:
+        return await conn.fetchval("""
+            INSERT INTO profiles (submission_id, profile_json, data_sources_used, confidence_score)
+            SELECT id, $2, $3, $4 FROM submissions WHERE job_id = $1
+            RETURNING id
+        """, job_id, profile_json, data_sources_used, confidence_score)
 
 
-def create_feedback(profile_id: int, rating: int, comment: Optional[str] = None) -> int:
+async def create_feedback(profile_id: int, rating: int, comment: Optional[str] = None) -> int:
     """Create feedback and return its ID."""
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO feedback (profile_id, rating, comment)
-                VALUES (%s, %s, %s)
-                RETURNING id
-            """, (profile_id, rating, comment))
-            result = cur.fetchone()
-            return result["id"]
+    async with pool.acquire() as conn:
+        return await conn.fetchval("""
+            INSERT INTO feedback (profile_id, rating, comment)
+            VALUES ($1, $2, $3)
+            RETURNING id
+        """, profile_id, rating, comment)
@@ -1,12 +1,12 @@
-import asyncio
-import uuid
-import re
 from datetime import datetime, timedelta
-from urllib.parse import urlparse
 from contextlib import asynccontextmanager
+from uuid import UUID
 
+import orjson
 import redis.asyncio as redis
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from arq import create_pool
+from arq.connections import RedisSettings
+from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
@@ -18,45 +18,45 @@ from app.schemas import (
     FeedbackRequest,
     SubmissionStatus,
 )
+from app.utils import normalize_url, extract_domain
 from app.database import (
+    init_pool,
+    close_pool,
     init_db,
     create_submission,
     get_submission_by_job_id,
-    get_submission_by_token,
-    get_submission_by_url,
-    update_submission_status,
-    create_profile,
-    get_profile_by_submission_id,
+    get_submission_and_profile_by_token,
+    get_profile_text_by_token,
     create_feedback,
 )
-from app.workers import (
-    scrape_site,
-    detect_technologies,
-    lookup_dns_whois,
-    fetch_google_business,
-    scan_job_postings,
-)
-from app.services.anthropic_service import generate_profile, check_data_sufficiency
-from app.services.email_service import (
-    send_profile_email,
-    send_insufficient_data_email,
-    send_error_email,
-)
+from app.services.http import get_http_client, close_http_client
+from app.tasks import process_submission
 
 
 # Redis connection
 redis_client = None
+rate_limit_script = None
+
+# Increment the counter and set its TTL only when the key is created
+RATE_LIMIT_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize resources on startup."""
-    global redis_client
-    settings = get_settings()
+    global redis_client, rate_limit_script
+    settings = app.state.settings = get_settings()
 
     # Initialize database
     try:
-        init_db()
+        app.state.pg_pool = await init_pool()
+        await init_db()
     except Exception as e:
         print(f"Warning: Could not initialize database: {e}")
 
@@ -64,22 +64,43 @@ async def lifespan(app: FastAPI):
     try:
         redis_client = redis.from_url(settings.redis_url)
         await redis_client.ping()
+        rate_limit_script = redis_client.register_script(RATE_LIMIT_LUA)
     except Exception as e:
         print(f"Warning: Could not connect to Redis: {e}")
         redis_client = None
 
+    # Initialize job queue
+    try:
+        app.state.arq = await create_pool(RedisSettings.from_dsn(settings.redis_url))
+    except Exception as e:
+        print(f"Warning: Could not connect to job queue: {e}")
+        app.state.arq = None
+
+    # Shared HTTP client for all workers
+    app.state.http = get_http_client()
+
     yield
 
     # Cleanup
+    await close_http_client()
+    await close_pool()
     if redis_client:
         await redis_client.close()
+    if app.state.arq:
+        await app.state.arq.close()
 
 
+# API docs are only served outside production
+docs_enabled = get_settings().environment != "production"
+
 app = FastAPI(
     title="HarnessAI Orchestrator",
     description="Operational intelligence profile generation API",
     version="1.0.0",
     lifespan=lifespan,
+    docs_url="/docs" if docs_enabled else None,
+    redoc_url="/redoc" if docs_enabled else None,
+    openapi_url="/openapi.json" if docs_enabled else None,
 )
 
 # CORS middleware
@@ -87,26 +108,16 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
 )
 
 
-def normalize_url(url: str) -> str:
-    """Normalize URL to have https:// scheme."""
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
-    return url.rstrip("/")
-
-
-def extract_domain(url: str) -> str:
-    """Extract the base domain from a URL."""
-    parsed = urlparse(normalize_url(url))
-    domain = parsed.netloc.lower()
-    # Remove www. prefix
-    if domain.startswith("www."):
-        domain = domain[4:]
-    return domain
+# Generic email providers (valid, but flagged for manual review)
+GENERIC_EMAIL_PROVIDERS = frozenset({
+    "gmail.com", "yahoo.com", "outlook.com", "hotmail.com",
+    "aol.com", "icloud.com", "protonmail.com", "mail.com",
+})
 
 
 def validate_email_domain(email: str, url: str) -> tuple[bool, bool]:
@@ -118,15 +129,11 @@ def validate_email_domain(email: str, url: str) -> tuple[bool, bool]:
     - (True, True): Email is a generic provider (Gmail/Yahoo/etc)
     - (False, False): Email domain doesn't match URL domain
     """
-    email_domain = email.split("@")[1].lower()
+    email_domain = email[email.rfind("@") + 1:].lower()
     url_domain = extract_domain(url)
 
     # Check for generic email providers
-    generic_providers = [
-        "gmail.com", "yahoo.com", "outlook.com", "hotmail.com",
-        "aol.com", "icloud.com", "protonmail.com", "mail.com",
-    ]
-    if email_domain in generic_providers:
+    if email_domain in GENERIC_EMAIL_PROVIDERS:
         return True, True  # Valid but needs manual review
 
     # Check for exact match or subdomain match
@@ -152,115 +159,12 @@ async def check_rate_limit(ip: str) -> bool:
 
     key = f"rate_limit:{ip}"
     try:
-        count = await redis_client.get(key)
-        if count and int(count) >= 10:
-            return False
-
-        pipe = redis_client.pipeline()
-        pipe.incr(key)
-        pipe.expire(key, 3600)  # 1 hour TTL
-        await pipe.execute()
-        return True
+        count = await rate_limit_script(keys=[key], args=[3600])  # 1 hour TTL
+        return count <= 10
     except Exception:
         return True  # Allow if error
 
 
-async def process_submission(job_id: str, auth_token: str, submission: IntakeRequest):
-    """Background task to process a submission."""
-    settings = get_settings()
-
-    try:
-        # Update status to processing
-        update_submission_status(job_id, SubmissionStatus.processing)
-
-        url = normalize_url(submission.company_url)
-
-        # Check cache first
-        cached = get_submission_by_url(url)
-        if cached and cached["status"] == "complete":
-            # Use cached profile
-            cached_profile = get_profile_by_submission_id(cached["id"])
-            if cached_profile:
-                # Get current submission ID
-                current = get_submission_by_job_id(job_id)
-                if current:
-                    create_profile(
-                        submission_id=current["id"],
-                        profile_json=cached_profile["profile_json"],
-                        data_sources_used=cached_profile["data_sources_used"],
-                        confidence_score=cached_profile["confidence_score"],
-                    )
-                    update_submission_status(job_id, SubmissionStatus.complete, datetime.now())
-                    await send_profile_email(submission.email, submission.company_name, auth_token)
-                    return
-
-        # Run all workers in parallel with timeout
-        worker_results = await asyncio.gather(
-            scrape_site(url),
-            detect_technologies(url),
-            lookup_dns_whois(url),
-            fetch_google_business(submission.company_name),
-            scan_job_postings(submission.company_name),
-            return_exceptions=True,
-        )
-
-        # Organize results
-        worker_data = {
-            "site_scraper": worker_results[0] if not isinstance(worker_results[0], Exception) else {"success": False, "error": str(worker_results[0])},
-            "tech_detector": worker_results[1] if not isinstance(worker_results[1], Exception) else {"success": False, "error": str(worker_results[1])},
-            "dns_whois": worker_results[2] if not isinstance(worker_results[2], Exception) else {"success": False, "error": str(worker_results[2])},
-            "google_business": worker_results[3] if not isinstance(worker_results[3], Exception) else {"success": False, "error": str(worker_results[3])},
-            "job_scanner": worker_results[4] if not isinstance(worker_results[4], Exception) else {"success": False, "error": str(worker_results[4])},
-        }
-
-        # Check data sufficiency
-        is_sufficient, available_sources = check_data_sufficiency(worker_data)
-
-        if not is_sufficient:
-            update_submission_status(job_id, SubmissionStatus.insufficient_data, datetime.now())
-            await send_insufficient_data_email(submission.email, submission.company_name)
-            return
-
-        # Generate profile with Anthropic
-        profile, error = await generate_profile(submission.company_name, worker_data)
-
-        if error or not profile:
-            update_submission_status(job_id, SubmissionStatus.failed, datetime.now())
-            await send_error_email(submission.email, submission.company_name)
-            return
-
-        # Store the profile
-        current = get_submission_by_job_id(job_id)
-        if current:
-            confidence_score = profile.get("data_confidence", {}).get("overall_score", "Medium")
-            create_profile(
-                submission_id=current["id"],
-                profile_json=profile,
-                data_sources_used=available_sources,
-                confidence_score=confidence_score,
-            )
-
-        # Update status and send email
-        update_submission_status(job_id, SubmissionStatus.complete, datetime.now())
-        await send_profile_email(submission.email, submission.company_name, auth_token)
-
-        # Cache in Redis (keyed by URL, 24h TTL)
-        if redis_client:
-            try:
-                cache_key = f"profile_cache:{url}"
-                await redis_client.setex(cache_key, 86400, job_id)
-            except Exception:
-                pass
-
-    except Exception as e:
-        print(f"Error processing submission {job_id}: {e}")
-        update_submission_status(job_id, SubmissionStatus.failed, datetime.now())
-        try:
-            await send_error_email(submission.email, submission.company_name)
-        except Exception:
-            pass
-
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Coolify."""
@@ -300,21 +204,15 @@ async def submit_intake(
             detail="Please use a business email address matching your company domain.",
         )
 
-    # Generate IDs
-    job_id = str(uuid.uuid4())
-    auth_token = str(uuid.uuid4())
-
     # Determine initial status
     initial_status = SubmissionStatus.manual_review if needs_review else SubmissionStatus.queued
 
-    # Create submission record
+    # Create submission record (IDs are generated by Postgres)
     try:
-        create_submission(
+        created = await create_submission(
             company_name=submission.company_name,
             company_url=normalize_url(submission.company_url),
             email=submission.email,
-            job_id=job_id,
-            auth_token=auth_token,
             status=initial_status,
         )
     except Exception as e:
@@ -323,9 +221,25 @@ async def submit_intake(
             detail="Failed to process submission. Please try again.",
         )
 
+    job_id = str(created["job_id"])
+    auth_token = str(created["auth_token"])
+
     # If valid (not needing manual review), queue the processing
     if not needs_review:
-        background_tasks.add_task(process_submission, job_id, auth_token, submission)
+        queued = False
+        if request.app.state.arq:
+            try:
+                await request.app.state.arq.enqueue_job(
+                    "process_submission", job_id, auth_token, submission.model_dump()
+                )
+                queued = True
+            except Exception as e:
+                print(f"Warning: Could not enqueue job {job_id}: {e}")
+
+        if not queued:
+            # No queue available, process in this process instead
+            ctx = {"redis": redis_client, "http": request.app.state.http}
+            background_tasks.add_task(process_submission, ctx, job_id, auth_token, submission.model_dump())
 
     return IntakeResponse(
         job_id=job_id,
@@ -336,15 +250,15 @@ async def submit_intake(
 
 
 @app.get("/status/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
+async def get_job_status(job_id: UUID):
     """Get the status of a submission."""
-    submission = get_submission_by_job_id(job_id)
+    submission = await get_submission_by_job_id(job_id)
 
     if not submission:
         raise HTTPException(status_code=404, detail="Job not found")
 
     return JobStatus(
-        job_id=job_id,
+        job_id=str(job_id),
         status=submission["status"],
         created_at=submission["created_at"],
         completed_at=submission["completed_at"],
@@ -352,13 +266,13 @@ async def get_job_status(job_id: str):
 
 
 @app.get("/profile/{token}")
-async def get_profile(token: str):
+async def get_profile(token: UUID):
     """
     Get a profile by its auth token.
 
     Tokens expire after 7 days.
     """
-    submission = get_submission_by_token(token)
+    submission = await get_profile_text_by_token(token)
 
     if not submission:
         raise HTTPException(status_code=404, detail="Profile not found")
@@ -377,36 +291,31 @@ async def get_profile(token: str):
             },
         )
 
-    profile = get_profile_by_submission_id(submission["id"])
-
-    if not profile:
+    if submission["profile_json_text"] is None:
         raise HTTPException(status_code=404, detail="Profile data not found")
 
-    return {
-        "profile": profile["profile_json"],
+    # Splice the stored JSON in as-is rather than decoding and re-encoding it
+    rest = orjson.dumps({
         "company_name": submission["company_name"],
-        "created_at": profile["created_at"],
-    }
+        "created_at": submission["profile_created_at"],
+    })
+    body = b'{"profile":' + submission["profile_json_text"].encode() + b"," + rest[1:]
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/profile/{token}/feedback")
-async def submit_feedback(token: str, feedback: FeedbackRequest):
+async def submit_feedback(token: UUID, feedback: FeedbackRequest):
     """Submit feedback for a profile."""
-    submission = get_submission_by_token(token)
-
-    if not submission:
-        raise HTTPException(status_code=404, detail="Profile not found")
-
-    profile = get_profile_by_submission_id(submission["id"])
+    submission = await get_submission_and_profile_by_token(token)
 
-    if not profile:
+    if not submission or submission["profile_json"] is None:
         raise HTTPException(status_code=404, detail="Profile not found")
 
     if feedback.rating < 1 or feedback.rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
 
-    create_feedback(
-        profile_id=profile["id"],
+    await create_feedback(
+        profile_id=submission["profile_id"],
         rating=feedback.rating,
         comment=feedback.comment,
     )
@@ -1,8 +1,13 @@
-from app.services.anthropic_service import generate_profile
+from app.services.anthropic_service import generate_profile, generate_profiles_batch
 from app.services.email_service import send_profile_email, send_insufficient_data_email
+from app.services.http import get_http_client, get_api_client, close_http_client
 
 __all__ = [
     "generate_profile",
+    "generate_profiles_batch",
     "send_profile_email",
     "send_insufficient_data_email",
+    "get_http_client",
+    "get_api_client",
+    "close_http_client",
 ]
@@ -1,9 +1,11 @@
-import json
 import asyncio
+import hashlib
+import random
 from typing import Optional
 from datetime import datetime
 
 import anthropic
+import orjson
 
 from app.config import get_settings
 from app.schemas import OperationalProfile
@@ -54,6 +56,18 @@ Profile JSON Schema:
 }"""
 
 
+# Shared async client (created on first use)
+_client: Optional[anthropic.AsyncAnthropic] = None
+
+
+def _get_client() -> anthropic.AsyncAnthropic:
+    """Return the shared Anthropic client, creating it if needed."""
+    global _client
+    if _client is None:
+        _client = anthropic.AsyncAnthropic(api_key=get_settings().anthropic_api_key)
+    return _client
+
+
 def validate_profile(profile: dict, worker_data: dict) -> tuple[bool, list[str]]:
     """
     Validate that the profile doesn't contain fabricated data.
@@ -93,14 +107,211 @@ def validate_profile(profile: dict, worker_data: dict) -> tuple[bool, list[str]]
     return len(issues) == 0, issues
 
 
+def _build_request(company_name: str, worker_data: dict) -> dict:
+    """Build the Messages API parameters for a profile request."""
+    # Compact JSON: indentation only adds input tokens
+    payload_json = orjson.dumps(worker_data, default=str).decode()
+
+    # Build the user message with all worker data
+    user_message = f"""Analyze this business data for {company_name} and generate an operational profile.
+
+Raw Data Collected:
+
+{payload_json}
+
+Current date: {datetime.now().strftime('%B %Y')}
+
+Generate the operational profile JSON now."""
+
+    return {
+        "model": "claude-sonnet-4-5-20250929",
+        "max_tokens": 2500,
+        "temperature": 0.3,
+        # The system prompt is identical on every call, so let the API cache it
+        "system": [
+            {
+                "type": "text",
+                "text": SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+        "messages": [
+            {"role": "user", "content": user_message}
+        ],
+    }
+
+
+def _parse_profile(response_text: str, worker_data: dict) -> dict:
+    """Parse and validate the profile JSON from a model response."""
+    # Parse JSON: take the outermost object, which also skips any markdown code block
+    start = response_text.find("{")
+    end = response_text.rfind("}")
+    json_str = response_text[start:end + 1] if start != -1 and end > start else response_text
+
+    profile = orjson.loads(json_str)
+
+    # Validate the profile
+    is_valid, issues = validate_profile(profile, worker_data)
+    if not is_valid:
+        # Log issues but don't fail - just note them
+        profile["_validation_issues"] = issues
+
+    return profile
+
+
+def _json_end(text: str, state: list) -> int:
+    """
+    Track brace depth across streamed chunks of a JSON object.
+
+    state is [depth, in_string, escaped] and is updated in place. Returns the
+    index just past the closing brace of the top-level object, or -1.
+    """
+    depth, in_string, escaped = state
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    state[:] = [depth, in_string, escaped]
+    return -1
+
+
+async def _stream_response_text(company_name: str, params: dict) -> str:
+    """
+    Stream a profile response, returning as soon as its JSON object is complete.
+
+    Falls back to reading the whole response if it doesn't start with "{"
+    (e.g. the JSON is wrapped in a markdown code block).
+    """
+    chunks = []
+    state = [0, False, False]
+    is_json = None
+
+    async with _get_client().messages.stream(**params) as stream:
+        async for text in stream.text_stream:
+            if is_json is None:
+                stripped = text.lstrip()
+                if not stripped:
+                    continue
+                is_json = stripped[0] == "{"
+                text = stripped
+
+            if is_json:
+                end = _json_end(text, state)
+                if end != -1:
+                    chunks.append(text[:end])
+                    break
+            chunks.append(text)
+
+        usage = stream.current_message_snapshot.usage
+        print(
+            f"Anthropic usage for {company_name}: "
+            f"cache_read={usage.cache_read_input_tokens}, "
+            f"cache_write={usage.cache_creation_input_tokens}, "
+            f"input={usage.input_tokens}"
+        )
+
+    return "".join(chunks)
+
+
+# Backoff between attempts, in seconds (the last delay repeats)
+RETRY_DELAYS = (1, 4, 16)
+
+
+async def _with_retry(fn, attempts: int, delays: tuple[float, ...] = RETRY_DELAYS, jitter: float = 0.2):
+    """
+    Await fn() until it succeeds, up to attempts times.
+
+    Sleeps with exponential backoff between attempts, randomized by +/- jitter
+    so rate-limited callers don't retry in lockstep. Re-raises the last error.
+    """
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            delay = delays[min(attempt, len(delays) - 1)]
+            await asyncio.sleep(delay * random.uniform(1 - jitter, 1 + jitter))
+
+
+# Generated profiles are cached in Redis for a week, keyed by their inputs
+PROFILE_CACHE_TTL = 7 * 86400
+
+# Generations in flight, so identical concurrent requests share one API call
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _profile_cache_key(company_name: str, worker_data: dict) -> str:
+    """Hash the profile inputs into a cache key (key order doesn't matter)."""
+    canonical = orjson.dumps(
+        {"company_name": company_name, "worker_data": worker_data},
+        default=str,
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return "profile:" + hashlib.sha256(canonical).hexdigest()
+
+
+async def _generate_and_cache(
+    company_name: str,
+    worker_data: dict,
+    max_retries: int,
+    redis_client,
+    cache_key: str,
+) -> tuple[Optional[dict], Optional[str]]:
+    """Generate a profile with retries and cache it in Redis on success."""
+    params = _build_request(company_name, worker_data)
+
+    async def attempt() -> dict:
+        # Stream the response so parsing can start as soon as the JSON closes
+        response_text = await _stream_response_text(company_name, params)
+        return _parse_profile(response_text, worker_data)
+
+    try:
+        profile = await _with_retry(attempt, max_retries)
+    except anthropic.RateLimitError:
+        return None, "Rate limited by Anthropic API after retries"
+    except anthropic.APIError as e:
+        return None, f"Anthropic API error: {str(e)}"
+    except orjson.JSONDecodeError as e:
+        return None, f"Failed to parse profile JSON: {str(e)}"
+    except Exception as e:
+        return None, f"Error generating profile: {str(e)}"
+
+    if redis_client:
+        try:
+            await redis_client.setex(cache_key, PROFILE_CACHE_TTL, orjson.dumps(profile))
+        except Exception:
+            pass
+
+    return profile, None
+
+
 async def generate_profile(
     company_name: str,
     worker_data: dict,
-    max_retries: int = 3
+    max_retries: int = 3,
+    redis_client=None,
+    force_refresh: bool = False
 ) -> tuple[Optional[dict], Optional[str]]:
     """
     Send aggregated worker data to Claude Sonnet and generate an operational profile.
 
+    If redis_client is given, a profile previously generated from the same
+    company name and worker data is returned without calling the API (unless
+    force_refresh is set). Identical concurrent requests share one API call.
+
     Returns (profile_dict, error_message).
     """
     settings = get_settings()
@@ -108,79 +319,78 @@ async def generate_profile(
     if not settings.anthropic_api_key:
         return None, "Anthropic API key not configured"
 
-    # Build the user message with all worker data
-    user_message = f"""Analyze this business data for {company_name} and generate an operational profile.
-
-Raw Data Collected:
-
-{json.dumps(worker_data, indent=2, default=str)}
+    cache_key = _profile_cache_key(company_name, worker_data)
 
-Current date: {datetime.now().strftime('%B %Y')}
-
-Generate the operational profile JSON now."""
-
-    # Retry with exponential backoff
-    delays = [1, 4, 16]  # seconds
-
-    for attempt in range(max_retries):
+    if redis_client and not force_refresh:
         try:
-            client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-
-            message = client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=2500,
-                temperature=0.3,
-                system=SYSTEM_PROMPT,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ]
-            )
-
-            # Extract the response text
-            response_text = message.content[0].text
-
-            # Parse JSON (handle potential markdown code blocks)
-            json_str = response_text
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0]
-
-            profile = json.loads(json_str.strip())
-
-            # Validate the profile
-            is_valid, issues = validate_profile(profile, worker_data)
-            if not is_valid:
-                # Log issues but don't fail - just note them
-                profile["_validation_issues"] = issues
-
-            return profile, None
-
-        except anthropic.RateLimitError:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delays[attempt])
-                continue
-            return None, "Rate limited by Anthropic API after retries"
-
-        except anthropic.APIError as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delays[attempt])
-                continue
-            return None, f"Anthropic API error: {str(e)}"
+            cached = await redis_client.get(cache_key)
+            if cached:
+                return orjson.loads(cached), None
+        except Exception:
+            pass  # Treat as a cache miss
+
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _generate_and_cache(company_name, worker_data, max_retries, redis_client, cache_key)
+        )
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+
+    # Shield so a cancelled caller doesn't cancel the generation for the others
+    return await asyncio.shield(task)
+
+
+async def generate_profiles_batch(
+    jobs: list[tuple[str, dict]],
+    poll_interval: float = 20.0
+) -> list[tuple[Optional[dict], Optional[str]]]:
+    """
+    Generate profiles for many companies through the Message Batches API.
 
-        except json.JSONDecodeError as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delays[attempt])
-                continue
-            return None, f"Failed to parse profile JSON: {str(e)}"
+    Batches cost about half as much as real-time calls but can take minutes
+    to hours, so use this for bulk or backfill runs, not interactive requests.
+    Takes (company_name, worker_data) pairs and returns (profile_dict,
+    error_message) pairs in the same order.
+    """
+    settings = get_settings()
 
-        except Exception as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delays[attempt])
+    if not settings.anthropic_api_key:
+        return [(None, "Anthropic API key not configured")] * len(jobs)
+
+    client = _get_client()
+    results = [(None, "No result returned for batch request")] * len(jobs)
+
+    try:
+        batch = await client.messages.batches.create(
+            requests=[
+                {"custom_id": str(i), "params": _build_request(company_name, worker_data)}
+                for i, (company_name, worker_data) in enumerate(jobs)
+            ]
+        )
+
+        while batch.processing_status != "ended":
+            await asyncio.sleep(poll_interval)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        async for entry in await client.messages.batches.results(batch.id):
+            i = int(entry.custom_id)
+            if entry.result.type != "succeeded":
+                results[i] = (None, f"Batch request {entry.result.type}")
                 continue
-            return None, f"Error generating profile: {str(e)}"
-
-    return None, "Failed to generate profile after all retries"
+            try:
+                response_text = entry.result.message.content[0].text
+                results[i] = (_parse_profile(response_text, jobs[i][1]), None)
+            except orjson.JSONDecodeError as e:
+                results[i] = (None, f"Failed to parse profile JSON: {str(e)}")
+            except Exception as e:
+                # One bad entry shouldn't lose the rest of the (already paid for) batch
+                results[i] = (None, f"Error generating profile: {str(e)}")
+
+    except anthropic.APIError as e:
+        return [(None, f"Anthropic API error: {str(e)}")] * len(jobs)
+
+    return results
 
 
 def check_data_sufficiency(worker_data: dict) -> tuple[bool, list[str]]:
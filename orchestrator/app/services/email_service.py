@@ -1,121 +1,118 @@
-import resend
+from string import Template
 from typing import Optional
 
 from app.config import get_settings
+from app.services.http import get_api_client
 
 
-def _get_profile_email_html(company_name: str, profile_url: str) -> str:
-    """Generate minimal HTML for the profile ready email."""
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        body {{
+RESEND_API_URL = "https://api.resend.com/emails"
+EMAIL_FROM = "HarnessAI <noreply@harnessai.co>"
+
+
+# Styles shared by every email
+_BODY_CSS = """        body {
             font-family: Inter, -apple-system, BlinkMacSystemFont, sans-serif;
             line-height: 1.5;
             color: #1a2b4a;
             max-width: 480px;
             margin: 0 auto;
             padding: 40px 20px;
-        }}
-        .button {{
+        }
+"""
+
+_BUTTON_CSS = """        .button {
             display: inline-block;
             background-color: #1a2b4a;
             color: white;
             text-decoration: none;
             padding: 12px 24px;
             margin-top: 20px;
-        }}
-        .footer {{
+        }
+"""
+
+_FOOTER_CSS = """        .footer {
             margin-top: 40px;
             font-size: 12px;
             color: #666;
-        }}
-    </style>
-</head>
-<body>
-    <p>Your operational profile for <strong>{company_name}</strong> is ready.</p>
-
-    <a href="{profile_url}" class="button">View Your Profile</a>
-
-    <p class="footer">
-        This link expires in 7 days.<br>
-        HarnessAI
-    </p>
-</body>
-</html>"""
+        }
+"""
 
 
-def _get_insufficient_data_email_html(company_name: str) -> str:
-    """Generate HTML for insufficient data email."""
-    return f"""<!DOCTYPE html>
+def _email_template(css: str, body: str) -> Template:
+    """Wrap an email body and its styles in the common HTML page."""
+    return Template(f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <style>
-        body {{
-            font-family: Inter, -apple-system, BlinkMacSystemFont, sans-serif;
-            line-height: 1.5;
-            color: #1a2b4a;
-            max-width: 480px;
-            margin: 0 auto;
-            padding: 40px 20px;
-        }}
-        .footer {{
-            margin-top: 40px;
-            font-size: 12px;
-            color: #666;
-        }}
-    </style>
+{css}    </style>
 </head>
 <body>
-    <p>We need a bit more information to build your operational profile for <strong>{company_name}</strong>.</p>
+{body}
+</body>
+</html>""")
 
-    <p>Our team will follow up within 24 hours.</p>
+
+# Templates are built once at import; sends only substitute the fields
+_PROFILE_EMAIL = _email_template(_BODY_CSS + _BUTTON_CSS + _FOOTER_CSS, """    <p>Your operational profile for <strong>$company_name</strong> is ready.</p>
+
+    <a href="$profile_url" class="button">View Your Profile</a>
 
     <p class="footer">
+        This link expires in 7 days.<br>
         HarnessAI
-    </p>
-</body>
-</html>"""
+    </p>""")
 
+_INSUFFICIENT_DATA_EMAIL = _email_template(_BODY_CSS + _FOOTER_CSS, """    <p>We need a bit more information to build your operational profile for <strong>$company_name</strong>.</p>
 
-def _get_error_email_html(company_name: str) -> str:
-    """Generate HTML for error notification email."""
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        body {{
-            font-family: Inter, -apple-system, BlinkMacSystemFont, sans-serif;
-            line-height: 1.5;
-            color: #1a2b4a;
-            max-width: 480px;
-            margin: 0 auto;
-            padding: 40px 20px;
-        }}
-        .footer {{
-            margin-top: 40px;
-            font-size: 12px;
-            color: #666;
-        }}
-    </style>
-</head>
-<body>
-    <p>We encountered an issue generating your operational profile for <strong>{company_name}</strong>.</p>
+    <p>Our team will follow up within 24 hours.</p>
+
+    <p class="footer">
+        HarnessAI
+    </p>""")
+
+_ERROR_EMAIL = _email_template(_BODY_CSS + _FOOTER_CSS, """    <p>We encountered an issue generating your operational profile for <strong>$company_name</strong>.</p>
 
     <p>Our team has been notified and will reach out within 24 hours.</p>
 
     <p class="footer">
         HarnessAI
-    </p>
-</body>
-</html>"""
+    </p>""")
+
+
+def _get_profile_email_html(company_name: str, profile_url: str) -> str:
+    """Generate minimal HTML for the profile ready email."""
+    return _PROFILE_EMAIL.substitute(company_name=company_name, profile_url=profile_url)
+
+
+def _get_insufficient_data_email_html(company_name: str) -> str:
+    """Generate HTML for insufficient data email."""
+    return _INSUFFICIENT_DATA_EMAIL.substitute(company_name=company_name)
+
+
+def _get_error_email_html(company_name: str) -> str:
+    """Generate HTML for error notification email."""
+    return _ERROR_EMAIL.substitute(company_name=company_name)
+
+
+async def _send(api_key: str, to_email: str, subject: str, html: str) -> tuple[bool, Optional[str]]:
+    """Send an email through the Resend REST API on the shared API client."""
+    try:
+        response = await get_api_client().post(
+            RESEND_API_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={
+                "from": EMAIL_FROM,
+                "to": [to_email],
+                "subject": subject,
+                "html": html,
+            },
+        )
+        response.raise_for_status()
+        return True, None
+    except Exception as e:
+        return False, f"Failed to send email: {str(e)}"
 
 
 async def send_profile_email(
@@ -133,20 +130,14 @@ async def send_profile_email(
     if not settings.resend_api_key:
         return False, "Resend API key not configured"
 
-    resend.api_key = settings.resend_api_key
-
     profile_url = f"{settings.base_url}/profile/{auth_token}"
 
-    try:
-        resend.Emails.send({
-            "from": "HarnessAI <noreply@harnessai.co>",
-            "to": [to_email],
-            "subject": "Your HarnessAI Operational Profile",
-            "html": _get_profile_email_html(company_name, profile_url),
-        })
-        return True, None
-    except Exception as e:
-        return False, f"Failed to send email: {str(e)}"
+    return await _send(
+        settings.resend_api_key,
+        to_email,
+        "Your HarnessAI Operational Profile",
+        _get_profile_email_html(company_name, profile_url),
+    )
 
 
 async def send_insufficient_data_email(
@@ -163,18 +154,12 @@ async def send_insufficient_data_email(
     if not settings.resend_api_key:
         return False, "Resend API key not configured"
 
-    resend.api_key = settings.resend_api_key
-
-    try:
-        resend.Emails.send({
-            "from": "HarnessAI <noreply@harnessai.co>",
-            "to": [to_email],
-            "subject": "Your HarnessAI Profile Request",
-            "html": _get_insufficient_data_email_html(company_name),
-        })
-        return True, None
-    except Exception as e:
-        return False, f"Failed to send email: {str(e)}"
+    return await _send(
+        settings.resend_api_key,
+        to_email,
+        "Your HarnessAI Profile Request",
+        _get_insufficient_data_email_html(company_name),
+    )
 
 
 async def send_error_email(
@@ -191,15 +176,9 @@ async def send_error_email(
     if not settings.resend_api_key:
         return False, "Resend API key not configured"
 
-    resend.api_key = settings.resend_api_key
-
-    try:
-        resend.Emails.send({
-            "from": "HarnessAI <noreply@harnessai.co>",
-            "to": [to_email],
-            "subject": "Your HarnessAI Profile Request",
-            "html": _get_error_email_html(company_name),
-        })
-        return True, None
-    except Exception as e:
-        return False, f"Failed to send email: {str(e)}"
+    return await _send(
+        settings.resend_api_key,
+        to_email,
+        "Your HarnessAI Profile Request",
+        _get_error_email_html(company_name),
+    )
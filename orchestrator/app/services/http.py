@@ -0,0 +1,58 @@
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
+
+import httpx
+
+
+# Shared HTTP clients (created on first use, closed on shutdown). Scraped sites
+# and credentialed API calls (e.g. Resend) use separate clients.
+_client: Optional[httpx.AsyncClient] = None
+_api_client: Optional[httpx.AsyncClient] = None
+
+
+def _no_cookies() -> CookieJar:
+    """A cookie jar that refuses every cookie, so no state carries over between requests."""
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP/2 client, reusing its pooled connections across calls."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            # Decode bodies with their declared charset, else UTF-8, never by sniffing the bytes
+            default_encoding="utf-8",
+            # Don't collect cookies from scraped sites or replay them on later submissions
+            cookies=_no_cookies(),
+            # Keep idle connections to scraped hosts and APIs around for reuse
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=50,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _client
+
+
+def get_api_client() -> httpx.AsyncClient:
+    """Get the shared client for credentialed API calls, kept apart from scraping."""
+    global _api_client
+    if _api_client is None:
+        _api_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            cookies=_no_cookies(),
+        )
+    return _api_client
+
+
+async def close_http_client():
+    """Close the shared HTTP clients."""
+    global _client, _api_client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _api_client is not None:
+        await _api_client.aclose()
+        _api_client = None
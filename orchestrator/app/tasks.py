@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import sys
+from typing import Optional
+
+import orjson
+from arq.connections import RedisSettings
+
+from app.config import get_settings
+from app.schemas import IntakeRequest, SubmissionStatus
+from app.utils import normalize_url
+from app.database import (
+    init_pool,
+    close_pool,
+    get_or_prepare_submission,
+    update_submission_status_now,
+    create_profile,
+    create_profile_for_job,
+)
+from app.workers import run_all_workers
+from app.services.http import get_http_client, close_http_client
+from app.services.anthropic_service import generate_profile, check_data_sufficiency
+from app.services.email_service import (
+    send_profile_email,
+    send_insufficient_data_email,
+    send_error_email,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Longest a submission may take before it's marked failed
+PROCESSING_TIMEOUT = 840
+
+
+async def get_cached_profile(redis_client, url: str) -> Optional[dict]:
+    """Get a recently generated profile for this URL from Redis."""
+    if not redis_client:
+        return None
+
+    try:
+        cached = await redis_client.get(f"profile_cache:{url}")
+        return orjson.loads(cached) if cached else None
+    except Exception:
+        return None  # Treat as a cache miss
+
+
+async def fail_submission(job_id: str, submission: IntakeRequest):
+    """Mark a submission failed and let the visitor know."""
+    await update_submission_status_now(job_id, SubmissionStatus.failed)
+    try:
+        await send_error_email(submission.email, submission.company_name)
+    except Exception:
+        pass
+
+
+async def process_submission(ctx: dict, job_id: str, auth_token: str, submission: dict):
+    """Queued job to process a submission."""
+    redis_client = ctx["redis"]
+    submission = IntakeRequest(**submission)
+
+    try:
+        # Give up well before arq's job_timeout, so an overrun takes the normal
+        # failure path below (a bare cancellation is a worker shutdown, and arq
+        # re-runs the job)
+        async with asyncio.timeout(PROCESSING_TIMEOUT):
+            url = normalize_url(submission.company_url)
+
+            # Check Redis cache first
+            cached = await get_cached_profile(redis_client, url)
+            if cached:
+                profile_id = await create_profile_for_job(
+                    job_id=job_id,
+                    profile_json=cached["profile_json"],
+                    data_sources_used=cached["data_sources_used"],
+                    confidence_score=cached["confidence_score"],
+                )
+                if profile_id is None:
+                    # No submission row for this job, so the profile link would 404
+                    logger.error("Submission %s not found", job_id)
+                    await fail_submission(job_id, submission)
+                    return
+                await update_submission_status_now(job_id, SubmissionStatus.complete)
+                await send_profile_email(submission.email, submission.company_name, auth_token)
+                return
+
+            # Update status to processing and fall back to the Postgres cache
+            current = await get_or_prepare_submission(job_id, url, SubmissionStatus.processing)
+            if current and current["profile_json"] is not None:
+                # Use cached profile
+                await create_profile(
+                    submission_id=current["id"],
+                    profile_json=current["profile_json"],
+                    data_sources_used=current["data_sources_used"],
+                    confidence_score=current["confidence_score"],
+                )
+                await update_submission_status_now(job_id, SubmissionStatus.complete)
+                await send_profile_email(submission.email, submission.company_name, auth_token)
+                return
+
+            # Run all workers in parallel, each with its own timeout
+            worker_data = await run_all_workers(ctx["http"], url, submission.company_name)
+
+            # Check data sufficiency
+            is_sufficient, available_sources = check_data_sufficiency(worker_data)
+
+            if not is_sufficient:
+                await update_submission_status_now(job_id, SubmissionStatus.insufficient_data)
+                await send_insufficient_data_email(submission.email, submission.company_name)
+                return
+
+            # Generate profile with Anthropic
+            profile, error = await generate_profile(
+                submission.company_name, worker_data, redis_client=redis_client
+            )
+
+            if error or not profile:
+                await update_submission_status_now(job_id, SubmissionStatus.failed)
+                await send_error_email(submission.email, submission.company_name)
+                return
+
+            # Store the profile
+            confidence_score = profile.get("data_confidence", {}).get("overall_score", "Medium")
+            if current:
+                await create_profile(
+                    submission_id=current["id"],
+                    profile_json=profile,
+                    data_sources_used=available_sources,
+                    confidence_score=confidence_score,
+                )
+
+            # Update status and send email
+            await update_submission_status_now(job_id, SubmissionStatus.complete)
+            await send_profile_email(submission.email, submission.company_name, auth_token)
+
+            # Cache in Redis (keyed by URL, 24h TTL)
+            if redis_client:
+                try:
+                    cache_key = f"profile_cache:{url}"
+                    await redis_client.setex(cache_key, 86400, orjson.dumps({
+                        "profile_json": profile,
+                        "data_sources_used": available_sources,
+                        "confidence_score": confidence_score,
+                    }))
+                except Exception:
+                    pass
+
+    except TimeoutError:
+        logger.error("Submission %s timed out after %ss", job_id, PROCESSING_TIMEOUT)
+        await fail_submission(job_id, submission)
+    except Exception as e:
+        logger.exception("Error processing submission %s: %s", job_id, e)
+        await fail_submission(job_id, submission)
+
+
+async def startup(ctx: dict):
+    """Initialize worker resources."""
+    await init_pool()
+    ctx["http"] = get_http_client()
+
+
+async def shutdown(ctx: dict):
+    """Release worker resources."""
+    await close_http_client()
+    await close_pool()
+
+
+# Run the arq worker on uvloop (uvicorn gets it from --loop uvloop). arq creates
+# its loop through the policy, so this must be set before the worker starts.
+if sys.platform != "win32":
+    import uvloop
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+class WorkerSettings:
+    """arq worker configuration (run with `arq app.tasks.WorkerSettings`)."""
+    functions = [process_submission]
+    on_startup = startup
+    on_shutdown = shutdown
+    # arq's default is 300s. A run can take the workers' 20s, then three streamed
+    # Sonnet attempts (each with the SDK's own retries) and 1+4+16s of backoff.
+    # Leave room after PROCESSING_TIMEOUT to mark the job failed.
+    job_timeout = PROCESSING_TIMEOUT + 60
+    redis_settings = RedisSettings.from_dsn(get_settings().redis_url)
@@ -0,0 +1,26 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlparse
+
+
+# Matches an explicit http:// or https:// scheme
+_match_scheme = re.compile(r"^https?://").match
+
+
+@lru_cache(maxsize=4096)
+def normalize_url(url: str) -> str:
+    """Normalize URL to have https:// scheme."""
+    if not _match_scheme(url):
+        url = "https://" + url
+    return url.rstrip("/")
+
+
+@lru_cache(maxsize=4096)
+def extract_domain(url: str) -> str:
+    """Extract the base domain from a URL."""
+    parsed = urlparse(normalize_url(url))
+    domain = parsed.netloc.lower()
+    # Remove www. prefix
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
@@ -1,13 +1,67 @@
+import asyncio
+from typing import Optional
+
+import httpx
+
+from app.workers.page import fetch_parsed_page
 from app.workers.site_scraper import scrape_site
 from app.workers.tech_detector import detect_technologies
 from app.workers.dns_whois import lookup_dns_whois
 from app.workers.google_business import fetch_google_business
 from app.workers.job_scanner import scan_job_postings
 
+
+async def bounded(coro, timeout: float) -> dict:
+    """Run a worker with a timeout, turning any failure into an error result."""
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        return {"success": False, "error": f"Timed out after {timeout}s"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+async def run_all_workers(
+    client: httpx.AsyncClient,
+    url: str,
+    company_name: str,
+    location: Optional[str] = None,
+) -> dict:
+    """
+    Run all five workers concurrently, each with its own timeout.
+
+    Returns the worker_data dict keyed by worker source name. A worker that
+    fails or times out contributes an error result instead of stalling the rest.
+    The site scraper and tech detector share a single fetch and parse of the main page.
+    """
+    # The scraper and tech detector analyze the same page, so fetch and parse it once
+    page = asyncio.ensure_future(fetch_parsed_page(client, url))
+
+    try:
+        results = await asyncio.gather(
+            bounded(scrape_site(client, url, page=page), 20),
+            bounded(detect_technologies(client, url, page=page), 15),
+            bounded(lookup_dns_whois(url), 15),
+            bounded(fetch_google_business(client, company_name, location), 15),
+            bounded(scan_job_postings(client, company_name, location), 15),
+        )
+    finally:
+        if not page.done():
+            page.cancel()
+        elif not page.cancelled():
+            page.exception()  # Already handled by the workers; mark it retrieved
+
+    return dict(zip(
+        ["site_scraper", "tech_detector", "dns_whois", "google_business", "job_scanner"],
+        results,
+    ))
+
+
 __all__ = [
     "scrape_site",
     "detect_technologies",
     "lookup_dns_whois",
     "fetch_google_business",
     "scan_job_postings",
+    "run_all_workers",
 ]
@@ -1,13 +1,90 @@
-import dns.resolver
+import dns.asyncresolver
+import dns.name
 import whois
 from urllib.parse import urlparse
 from typing import Optional
 import asyncio
+import re
 from concurrent.futures import ThreadPoolExecutor
 
+from cachetools import TLRUCache, TTLCache
 
-def _sync_dns_lookup(domain: str) -> dict:
-    """Synchronous DNS lookup."""
+
+# MX hostname keywords and the email provider they indicate, in priority order
+MX_PROVIDERS = {
+    "google": "Google Workspace",
+    "googlemail": "Google Workspace",
+    "outlook": "Microsoft 365",
+    "microsoft": "Microsoft 365",
+    "zoho": "Zoho Mail",
+    "protonmail": "ProtonMail",
+    "mimecast": "Mimecast",
+    "barracuda": "Barracuda",
+}
+MX_PROVIDER_RE = re.compile(r"google(?:mail)?|outlook|microsoft|zoho|protonmail|mimecast|barracuda")
+
+# Shared resolver for all DNS lookups
+_resolver = dns.asyncresolver.Resolver()
+
+# Shared pool for the blocking WHOIS calls
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dnswhois")
+
+# DNS answers are kept for their record TTL, capped at an hour
+DNS_CACHE_MAX_TTL = 3600
+_dns_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _key, answer, now: now + min(answer.rrset.ttl, DNS_CACHE_MAX_TTL),
+)
+
+# WHOIS records change on a scale of days
+_whois_cache = TTLCache(maxsize=10_000, ttl=86400)
+
+# Lookups in flight, so concurrent requests for the same key share one answer
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+async def _fill(cache, key, fetch, worth_caching=bool):
+    """Run a lookup and cache its result if worth_caching(result) (by default, if non-empty)."""
+    value = await fetch()
+    if worth_caching(value):
+        cache[key] = value
+    return value
+
+
+async def _cached(cache, key, fetch, worth_caching=bool):
+    """Return a cached lookup, or run it once for all concurrent callers."""
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fill(cache, key, fetch, worth_caching))
+        _inflight[key] = task
+
+        def _done(t):
+            _inflight.pop(key, None)
+            if not t.cancelled():
+                t.exception()  # Mark as retrieved even if every caller timed out
+
+        task.add_done_callback(_done)
+
+    # Shield so one caller's timeout doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+def _resolve(name: dns.name.Name, rdtype: str, timeout: float):
+    """Resolve a record for an absolute name through the DNS cache."""
+    return _cached(
+        _dns_cache,
+        (name, rdtype),
+        lambda: _resolver.resolve(name, rdtype, lifetime=timeout, search=False),
+    )
+
+
+async def _async_dns_lookup(domain: str, timeout: float) -> dict:
+    """Run the MX, TXT, DMARC and NS lookups concurrently."""
     result = {
         "mx_records": [],
         "txt_records": [],
@@ -18,71 +95,57 @@ def _sync_dns_lookup(domain: str) -> dict:
         "has_dmarc": False,
     }
 
-    try:
-        # MX records (email provider)
-        try:
-            mx_answers = dns.resolver.resolve(domain, "MX")
-            result["mx_records"] = [str(r.exchange).rstrip(".") for r in mx_answers]
-
-            # Detect email provider from MX records
-            mx_str = " ".join(result["mx_records"]).lower()
-            if "google" in mx_str or "googlemail" in mx_str:
-                result["email_provider"] = "Google Workspace"
-            elif "outlook" in mx_str or "microsoft" in mx_str:
-                result["email_provider"] = "Microsoft 365"
-            elif "zoho" in mx_str:
-                result["email_provider"] = "Zoho Mail"
-            elif "protonmail" in mx_str:
-                result["email_provider"] = "ProtonMail"
-            elif "mimecast" in mx_str:
-                result["email_provider"] = "Mimecast"
-            elif "barracuda" in mx_str:
-                result["email_provider"] = "Barracuda"
-            else:
-                result["email_provider"] = "Custom/Other"
-        except dns.resolver.NoAnswer:
-            pass
-        except dns.resolver.NXDOMAIN:
-            pass
-
-        # TXT records (SPF, DKIM, DMARC)
-        try:
-            txt_answers = dns.resolver.resolve(domain, "TXT")
-            for txt in txt_answers:
-                txt_str = str(txt)
-                result["txt_records"].append(txt_str[:200])
-                if "v=spf1" in txt_str:
-                    result["has_spf"] = True
-        except dns.resolver.NoAnswer:
-            pass
-        except dns.resolver.NXDOMAIN:
-            pass
-
-        # Check DMARC
-        try:
-            dmarc_answers = dns.resolver.resolve(f"_dmarc.{domain}", "TXT")
-            for txt in dmarc_answers:
-                if "v=DMARC1" in str(txt):
-                    result["has_dmarc"] = True
-                    break
-        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
-            pass
-
-        # Nameservers
-        try:
-            ns_answers = dns.resolver.resolve(domain, "NS")
-            result["nameservers"] = [str(r).rstrip(".") for r in ns_answers]
-        except dns.resolver.NoAnswer:
-            pass
-        except dns.resolver.NXDOMAIN:
-            pass
-
-    except Exception:
-        pass
+    # Parse the names once; absolute names skip the resolver's search list
+    name = dns.name.from_text(domain)
+    dmarc_name = dns.name.from_text("_dmarc", origin=name)
+
+    # Failed lookups (NoAnswer, NXDOMAIN, timeouts) are skipped individually
+    mx_answers, txt_answers, dmarc_answers, ns_answers = await asyncio.gather(
+        _resolve(name, "MX", timeout),
+        _resolve(name, "TXT", timeout),
+        _resolve(dmarc_name, "TXT", timeout),
+        _resolve(name, "NS", timeout),
+        return_exceptions=True,
+    )
+
+    # MX records (email provider)
+    if not isinstance(mx_answers, Exception):
+        result["mx_records"] = [str(r.exchange).rstrip(".") for r in mx_answers]
+
+        # Detect email provider from MX records (one scan, then by priority)
+        found = set(MX_PROVIDER_RE.findall(" ".join(result["mx_records"]).lower()))
+        result["email_provider"] = next(
+            (provider for keyword, provider in MX_PROVIDERS.items() if keyword in found),
+            "Custom/Other",
+        )
+
+    # TXT records (SPF, DKIM, DMARC)
+    if not isinstance(txt_answers, Exception):
+        for txt in txt_answers:
+            txt_str = str(txt)
+            result["txt_records"].append(txt_str[:200])
+            if "v=spf1" in txt_str:
+                result["has_spf"] = True
+
+    # Check DMARC
+    if not isinstance(dmarc_answers, Exception):
+        for txt in dmarc_answers:
+            if "v=DMARC1" in str(txt):
+                result["has_dmarc"] = True
+                break
+
+    # Nameservers
+    if not isinstance(ns_answers, Exception):
+        result["nameservers"] = [str(r).rstrip(".") for r in ns_answers]
 
     return result
 
 
+def _whois_found(record: dict) -> bool:
+    """Whether a WHOIS lookup found anything (failed lookups return all None)."""
+    return any(value is not None for value in record.values())
+
+
 def _sync_whois_lookup(domain: str) -> dict:
     """Synchronous WHOIS lookup."""
     result = {
@@ -124,6 +187,14 @@ def _sync_whois_lookup(domain: str) -> dict:
     return result
 
 
+async def _with_timeout(lookup, timeout: float, timeout_error: str) -> dict:
+    """Await a lookup, returning an error dict on timeout."""
+    try:
+        return await asyncio.wait_for(lookup, timeout=timeout)
+    except asyncio.TimeoutError:
+        return {"error": timeout_error}
+
+
 async def lookup_dns_whois(url: str, timeout: float = 10.0) -> dict:
     """
     Perform DNS and WHOIS lookups on the domain.
@@ -151,23 +222,31 @@ async def lookup_dns_whois(url: str, timeout: float = 10.0) -> dict:
         domain = domain.replace("www.", "")
         result["domain"] = domain
 
-        # Run DNS and WHOIS lookups in thread pool (they're blocking)
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            dns_future = loop.run_in_executor(executor, _sync_dns_lookup, domain)
-            whois_future = loop.run_in_executor(executor, _sync_whois_lookup, domain)
-
-            try:
-                result["dns"] = await asyncio.wait_for(dns_future, timeout=timeout)
-            except asyncio.TimeoutError:
-                result["dns"] = {"error": "DNS lookup timed out"}
-
-            try:
-                result["whois"] = await asyncio.wait_for(whois_future, timeout=timeout)
-            except asyncio.TimeoutError:
-                result["whois"] = {"error": "WHOIS lookup timed out"}
-
-        result["success"] = bool(result["dns"] or result["whois"])
+        # DNS is natively async; WHOIS is blocking and runs in the thread pool.
+        # Each half fails on its own, so one error doesn't discard the other's result.
+        loop = asyncio.get_running_loop()
+        dns_result, whois_result = await asyncio.gather(
+            _with_timeout(_async_dns_lookup(domain, timeout), timeout, "DNS lookup timed out"),
+            _with_timeout(
+                _cached(
+                    _whois_cache,
+                    domain,
+                    lambda: loop.run_in_executor(_executor, _sync_whois_lookup, domain),
+                    worth_caching=_whois_found,
+                ),
+                timeout,
+                "WHOIS lookup timed out",
+            ),
+            return_exceptions=True,
+        )
+
+        if isinstance(dns_result, Exception):
+            dns_result = {"error": f"DNS lookup failed: {str(dns_result)}"}
+        if isinstance(whois_result, Exception):
+            whois_result = {"error": f"WHOIS lookup failed: {str(whois_result)}"}
+        result["dns"], result["whois"] = dns_result, whois_result
+
+        result["success"] = any(part and "error" not in part for part in (dns_result, whois_result))
 
     except Exception as e:
         result["error"] = f"Error in DNS/WHOIS lookup: {str(e)}"
@@ -1,16 +1,155 @@
 import httpx
+import orjson
 from typing import Optional
 
 from app.config import get_settings
 
 
+PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+
+# Everything the profile uses, so no separate Place Details call is needed
+# (photos are only counted, so just their names are requested)
+PLACES_FIELD_MASK = ",".join([
+    "places.id",
+    "places.displayName",
+    "places.rating",
+    "places.userRatingCount",
+    "places.formattedAddress",
+    "places.types",
+    "places.priceLevel",
+    "places.photos.name",
+    "places.nationalPhoneNumber",
+    "places.websiteUri",
+    "places.regularOpeningHours.weekdayDescriptions",
+])
+
+# Places API (New) price levels, mapped to the legacy 0-4 scale
+PRICE_LEVELS = {
+    "PRICE_LEVEL_FREE": 0,
+    "PRICE_LEVEL_INEXPENSIVE": 1,
+    "PRICE_LEVEL_MODERATE": 2,
+    "PRICE_LEVEL_EXPENSIVE": 3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
+
+
+async def _search_places(
+    client: httpx.AsyncClient,
+    query: str,
+    api_key: str,
+    timeout: float,
+    result: dict,
+) -> bool:
+    """
+    Fill result from a single Places API (New) Text Search request.
+
+    Returns False if the API rejected the request (e.g. not enabled for this key).
+    """
+    response = await client.post(
+        PLACES_SEARCH_URL,
+        json={"textQuery": query},
+        headers={"X-Goog-Api-Key": api_key, "X-Goog-FieldMask": PLACES_FIELD_MASK},
+        timeout=timeout,
+    )
+    if response.status_code != 200:
+        return False
+
+    places = orjson.loads(response.content).get("places")
+    if not places:
+        result["error"] = "No results found: ZERO_RESULTS"
+        return True
+
+    # Get the first (most relevant) result
+    place = places[0]
+    result["place_id"] = place.get("id")
+    result["name"] = place.get("displayName", {}).get("text")
+    result["rating"] = place.get("rating")
+    result["review_count"] = place.get("userRatingCount")
+    result["address"] = place.get("formattedAddress")
+    result["business_category"] = place.get("types", [None])[0]
+    result["price_level"] = PRICE_LEVELS.get(place.get("priceLevel"))
+    result["phone"] = place.get("nationalPhoneNumber")
+    result["website"] = place.get("websiteUri")
+
+    if place.get("photos"):
+        result["photo_count"] = len(place["photos"])
+
+    if place.get("regularOpeningHours"):
+        result["hours"] = place["regularOpeningHours"].get("weekdayDescriptions")
+
+    result["success"] = True
+    return True
+
+
+async def _search_places_legacy(
+    client: httpx.AsyncClient,
+    query: str,
+    api_key: str,
+    timeout: float,
+    result: dict,
+):
+    """Fill result from the legacy Places API (Text Search, then Place Details)."""
+    # Text Search to find the place
+    search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+    search_params = {
+        "query": query,
+        "key": api_key,
+    }
+
+    search_response = await client.get(search_url, params=search_params, timeout=timeout)
+    search_data = orjson.loads(search_response.content)
+
+    if search_data.get("status") != "OK" or not search_data.get("results"):
+        result["error"] = f"No results found: {search_data.get('status', 'Unknown error')}"
+        return
+
+    # Get the first (most relevant) result
+    place = search_data["results"][0]
+    place_id = place.get("place_id")
+    result["place_id"] = place_id
+
+    # Basic info from text search
+    result["name"] = place.get("name")
+    result["rating"] = place.get("rating")
+    result["review_count"] = place.get("user_ratings_total")
+    result["address"] = place.get("formatted_address")
+    result["business_category"] = place.get("types", [None])[0]
+    result["price_level"] = place.get("price_level")
+
+    if place.get("photos"):
+        result["photo_count"] = len(place["photos"])
+
+    # Get more details via Place Details API
+    if place_id:
+        details_url = "https://maps.googleapis.com/maps/api/place/details/json"
+        details_params = {
+            "place_id": place_id,
+            "fields": "formatted_phone_number,website,opening_hours,reviews",
+            "key": api_key,
+        }
+
+        details_response = await client.get(details_url, params=details_params, timeout=timeout)
+        details_data = orjson.loads(details_response.content)
+
+        if details_data.get("status") == "OK" and details_data.get("result"):
+            details = details_data["result"]
+            result["phone"] = details.get("formatted_phone_number")
+            result["website"] = details.get("website")
+
+            if details.get("opening_hours"):
+                result["hours"] = details["opening_hours"].get("weekday_text")
+
+    result["success"] = True
+
+
 async def fetch_google_business(
+    client: httpx.AsyncClient,
     company_name: str,
     location: Optional[str] = None,
     timeout: float = 10.0
 ) -> dict:
     """
-    Use Google Places API (Text Search) to find the business.
+    Use Google Places API (New) Text Search to find the business.
 
     Extracts:
     - Rating
@@ -52,58 +191,9 @@ async def fetch_google_business(
         if location:
             query = f"{company_name} {location}"
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # Text Search to find the place
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-            search_params = {
-                "query": query,
-                "key": api_key,
-            }
-
-            search_response = await client.get(search_url, params=search_params)
-            search_data = search_response.json()
-
-            if search_data.get("status") != "OK" or not search_data.get("results"):
-                result["error"] = f"No results found: {search_data.get('status', 'Unknown error')}"
-                return result
-
-            # Get the first (most relevant) result
-            place = search_data["results"][0]
-            place_id = place.get("place_id")
-            result["place_id"] = place_id
-
-            # Basic info from text search
-            result["name"] = place.get("name")
-            result["rating"] = place.get("rating")
-            result["review_count"] = place.get("user_ratings_total")
-            result["address"] = place.get("formatted_address")
-            result["business_category"] = place.get("types", [None])[0]
-            result["price_level"] = place.get("price_level")
-
-            if place.get("photos"):
-                result["photo_count"] = len(place["photos"])
-
-            # Get more details via Place Details API
-            if place_id:
-                details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-                details_params = {
-                    "place_id": place_id,
-                    "fields": "formatted_phone_number,website,opening_hours,reviews",
-                    "key": api_key,
-                }
-
-                details_response = await client.get(details_url, params=details_params)
-                details_data = details_response.json()
-
-                if details_data.get("status") == "OK" and details_data.get("result"):
-                    details = details_data["result"]
-                    result["phone"] = details.get("formatted_phone_number")
-                    result["website"] = details.get("website")
-
-                    if details.get("opening_hours"):
-                        result["hours"] = details["opening_hours"].get("weekday_text")
-
-            result["success"] = True
+        # One Places API (New) call; fall back to the legacy API if it's unavailable
+        if not await _search_places(client, query, api_key, timeout, result):
+            await _search_places_legacy(client, query, api_key, timeout, result)
 
     except httpx.TimeoutException:
         result["error"] = "Timeout - Google Places API took too long to respond"
@@ -1,10 +1,84 @@
+import ahocorasick
 import httpx
+import orjson
 from typing import Optional
 
 from app.config import get_settings
 
 
+# Title keywords per department, in priority order (first bucket wins)
+DEPARTMENT_KEYWORDS = [
+    ("Engineering", ["engineer", "developer", "software", "tech", "devops", "sre"]),
+    ("Sales", ["sales", "account", "business development"]),
+    ("Marketing", ["marketing", "content", "brand", "seo", "growth"]),
+    ("Human Resources", ["hr", "human resources", "recruiter", "people"]),
+    ("Finance", ["finance", "accounting", "controller", "cfo"]),
+    ("Operations", ["operations", "ops", "logistics", "supply"]),
+    ("Product", ["product", "pm", "product manager"]),
+    ("Design", ["design", "ux", "ui", "creative"]),
+    ("Customer Success", ["customer", "support", "success"]),
+]
+
+# Title keywords per seniority level, in priority order (first bucket wins)
+SENIORITY_KEYWORDS = [
+    ("Intern", ["intern", "internship"]),
+    ("Junior", ["junior", "entry", "associate", "jr"]),
+    ("Senior", ["senior", "sr", "lead", "principal"]),
+    ("Manager", ["manager", "director", "head of"]),
+    ("Executive", ["vp", "vice president", "chief", "cto", "ceo", "cfo"]),
+]
+
+
+def _build_title_automaton() -> ahocorasick.Automaton:
+    """Build one automaton over every department and seniority keyword."""
+    labels = {}
+    for kind, buckets in (("department", DEPARTMENT_KEYWORDS), ("seniority", SENIORITY_KEYWORDS)):
+        for rank, (_, keywords) in enumerate(buckets):
+            for keyword in keywords:
+                # A keyword can belong to several buckets (e.g. "cfo")
+                labels.setdefault(keyword, []).append((kind, rank))
+
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_labels in labels.items():
+        automaton.add_word(keyword, (len(keyword), keyword_labels))
+    automaton.make_automaton()
+    return automaton
+
+
+TITLE_AUTOMATON = _build_title_automaton()
+
+
+def classify_title(title_lower: str) -> tuple[Optional[str], str]:
+    """
+    Infer the department and seniority of a lowercased job title.
+
+    Scans the title once for all keywords. Keywords must start at a word
+    boundary (so "cooperations" doesn't match "operations"), and when
+    several buckets match, the highest-priority one wins.
+    """
+    best = {"department": len(DEPARTMENT_KEYWORDS), "seniority": len(SENIORITY_KEYWORDS)}
+
+    for end, (length, keyword_labels) in TITLE_AUTOMATON.iter(title_lower):
+        start = end - length + 1
+        if start and (title_lower[start - 1].isalnum() or title_lower[start - 1] == "_"):
+            continue
+        for kind, rank in keyword_labels:
+            if rank < best[kind]:
+                best[kind] = rank
+
+    department = None
+    if best["department"] < len(DEPARTMENT_KEYWORDS):
+        department = DEPARTMENT_KEYWORDS[best["department"]][0]
+
+    seniority = "Mid-level"
+    if best["seniority"] < len(SENIORITY_KEYWORDS):
+        seniority = SENIORITY_KEYWORDS[best["seniority"]][0]
+
+    return department, seniority
+
+
 async def scan_job_postings(
+    client: httpx.AsyncClient,
     company_name: str,
     location: Optional[str] = None,
     timeout: float = 10.0
@@ -45,89 +119,65 @@ async def scan_job_postings(
         if location:
             query = f"{company_name} {location} jobs"
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # Use SerpAPI Google Jobs endpoint
-            search_url = "https://serpapi.com/search.json"
-            params = {
-                "engine": "google_jobs",
-                "q": query,
-                "api_key": api_key,
-            }
-
-            response = await client.get(search_url, params=params)
-            data = response.json()
-
-            if "error" in data:
-                result["error"] = data["error"]
-                return result
-
-            jobs = data.get("jobs_results", [])
-
-            if not jobs:
-                result["success"] = True
-                result["error"] = "No job postings found"
-                return result
-
-            result["total_positions"] = len(jobs)
-
-            # Extract job details
-            titles = []
-            departments = set()
-            seniority = set()
-            recent = []
-
-            for job in jobs[:10]:  # Limit to first 10
-                title = job.get("title", "")
-                titles.append(title)
-
-                # Try to infer department from title
-                title_lower = title.lower()
-                if any(kw in title_lower for kw in ["engineer", "developer", "software", "tech", "devops", "sre"]):
-                    departments.add("Engineering")
-                elif any(kw in title_lower for kw in ["sales", "account", "business development"]):
-                    departments.add("Sales")
-                elif any(kw in title_lower for kw in ["marketing", "content", "brand", "seo", "growth"]):
-                    departments.add("Marketing")
-                elif any(kw in title_lower for kw in ["hr", "human resources", "recruiter", "people"]):
-                    departments.add("Human Resources")
-                elif any(kw in title_lower for kw in ["finance", "accounting", "controller", "cfo"]):
-                    departments.add("Finance")
-                elif any(kw in title_lower for kw in ["operations", "ops", "logistics", "supply"]):
-                    departments.add("Operations")
-                elif any(kw in title_lower for kw in ["product", "pm", "product manager"]):
-                    departments.add("Product")
-                elif any(kw in title_lower for kw in ["design", "ux", "ui", "creative"]):
-                    departments.add("Design")
-                elif any(kw in title_lower for kw in ["customer", "support", "success"]):
-                    departments.add("Customer Success")
-
-                # Try to infer seniority
-                if any(kw in title_lower for kw in ["intern", "internship"]):
-                    seniority.add("Intern")
-                elif any(kw in title_lower for kw in ["junior", "entry", "associate", "jr"]):
-                    seniority.add("Junior")
-                elif any(kw in title_lower for kw in ["senior", "sr", "lead", "principal"]):
-                    seniority.add("Senior")
-                elif any(kw in title_lower for kw in ["manager", "director", "head of"]):
-                    seniority.add("Manager")
-                elif any(kw in title_lower for kw in ["vp", "vice president", "chief", "cto", "ceo", "cfo"]):
-                    seniority.add("Executive")
-                else:
-                    seniority.add("Mid-level")
-
-                # Add to recent postings
-                recent.append({
-                    "title": title,
-                    "company": job.get("company_name"),
-                    "location": job.get("location"),
-                    "posted": job.get("detected_extensions", {}).get("posted_at"),
-                })
-
-            result["job_titles"] = titles
-            result["departments"] = list(departments)
-            result["seniority_levels"] = list(seniority)
-            result["recent_postings"] = recent[:5]
+        # Use SerpAPI Google Jobs endpoint
+        search_url = "https://serpapi.com/search.json"
+        params = {
+            "engine": "google_jobs",
+            "q": query,
+            "api_key": api_key,
+        }
+
+        response = await client.get(search_url, params=params, timeout=timeout)
+        data = orjson.loads(response.content)
+
+        if "error" in data:
+            result["error"] = data["error"]
+            return result
+
+        jobs = data.get("jobs_results", [])
+
+        if not jobs:
             result["success"] = True
+            result["error"] = "No job postings found"
+            return result
+
+        result["total_positions"] = len(jobs)
+
+        # Extract job details
+        titles = []
+        departments = set()
+        seniority = set()
+        recent = []
+
+        # Bind the bound methods once rather than looking them up per job
+        titles_append = titles.append
+        departments_add = departments.add
+        seniority_add = seniority.add
+        recent_append = recent.append
+
+        for job in jobs[:10]:  # Limit to first 10
+            title = job.get("title", "")
+            titles_append(title)
+
+            # Infer department and seniority from title
+            department, level = classify_title(title.lower())
+            if department:
+                departments_add(department)
+            seniority_add(level)
+
+            # Add to recent postings
+            recent_append({
+                "title": title,
+                "company": job.get("company_name"),
+                "location": job.get("location"),
+                "posted": job.get("detected_extensions", {}).get("posted_at"),
+            })
+
+        result["job_titles"] = titles
+        result["departments"] = list(departments)
+        result["seniority_levels"] = list(seniority)
+        result["recent_postings"] = recent[:5]
+        result["success"] = True
 
     except httpx.TimeoutException:
         result["error"] = "Timeout - job search took too long"
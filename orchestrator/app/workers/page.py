@@ -0,0 +1,136 @@
+import asyncio
+from typing import Optional
+
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+
+# Identify ourselves to scraped sites
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; HarnessAI/1.0; +https://harnessai.co)"
+}
+
+# Most of the main page we read; analysis only needs its head and links
+MAX_PAGE_BYTES = 1_500_000
+
+# Largest subpage worth downloading (bigger ones are rarely real content pages)
+MAX_SUBPAGE_BYTES = 2_000_000
+
+
+async def _read_capped(response: httpx.Response, max_bytes: int) -> httpx.Response:
+    """Read a streamed response's body, stopping at max_bytes, into a plain Response."""
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+
+    # The body is already decoded (and maybe truncated), so drop the headers describing the original
+    headers = [
+        (name, value) for name, value in response.headers.multi_items()
+        if name not in ("content-encoding", "content-length")
+    ]
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        content=b"".join(chunks)[:max_bytes],
+        request=response.request,
+    )
+
+
+async def fetch_page(client: httpx.AsyncClient, url: str, timeout: float = 10.0) -> httpx.Response:
+    """
+    Fetch a page for analysis, following redirects.
+
+    The body is streamed and cut off at MAX_PAGE_BYTES, so a huge page can't
+    blow up memory or parse time.
+    """
+    # Fail fast on unreachable hosts rather than spending the whole budget connecting
+    async with client.stream(
+        "GET",
+        url,
+        headers=HEADERS,
+        timeout=httpx.Timeout(timeout, connect=3.0),
+        follow_redirects=True,
+    ) as response:
+        return await _read_capped(response, MAX_PAGE_BYTES)
+
+
+def is_html(response: httpx.Response) -> bool:
+    """Whether a response may be an HTML page (its Content-Type is missing or mentions html)."""
+    content_type = response.headers.get("content-type", "").lower()
+    return not content_type or "html" in content_type
+
+
+def parse_html(html: str) -> LexborHTMLParser:
+    """Parse a page, dropping script and style contents so they don't count as text."""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    return tree
+
+
+async def fetch_parsed_page(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = 10.0,
+) -> tuple[httpx.Response, Optional[LexborHTMLParser]]:
+    """
+    Fetch a page and parse it once for every worker analyzing it.
+
+    The tree is None when the request failed (the workers report the status)
+    or the response isn't HTML (JSON, images, downloads aren't worth parsing).
+    """
+    response = await fetch_page(client, url, timeout)
+    tree = parse_html(response.text) if response.is_success and is_html(response) else None
+    return response, tree
+
+
+async def fetch_html_page(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = 10.0,
+) -> Optional[httpx.Response]:
+    """
+    Fetch a page only if it's HTML of a reasonable size.
+
+    The headers are checked before the body is read, so links to PDFs, images
+    or files declared too big are dropped without downloading them (returns
+    None). A body without a Content-Length is read up to MAX_SUBPAGE_BYTES.
+    """
+    async with client.stream(
+        "GET",
+        url,
+        headers=HEADERS,
+        timeout=httpx.Timeout(timeout, connect=3.0),
+        follow_redirects=True,
+    ) as response:
+        response.raise_for_status()
+        if not is_html(response):
+            return None
+        # A missing or malformed length is treated as unknown (the read is capped anyway)
+        try:
+            content_length = int(response.headers.get("content-length", "0"))
+        except ValueError:
+            content_length = 0
+        if content_length >= MAX_SUBPAGE_BYTES:
+            return None
+        return await _read_capped(response, MAX_SUBPAGE_BYTES)
+
+
+async def get_page(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float,
+    page: Optional[asyncio.Future] = None,
+) -> tuple[httpx.Response, Optional[LexborHTMLParser]]:
+    """
+    Get the main page and its parsed tree, from a shared fetch if one was started.
+
+    The shared fetch is shielded so a worker timing out doesn't cancel it for
+    the other workers awaiting the same page.
+    """
+    if page is None:
+        return await fetch_parsed_page(client, url, timeout)
+    return await asyncio.shield(page)
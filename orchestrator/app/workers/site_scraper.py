@@ -1,11 +1,68 @@
+import ahocorasick
 import httpx
-from bs4 import BeautifulSoup
 from typing import Optional
 from urllib.parse import urljoin, urlparse
 import asyncio
-
-
-async def scrape_site(url: str, timeout: float = 10.0) -> dict:
+import re
+
+from app.workers.page import fetch_html_page, get_page, parse_html
+
+
+# Link keywords for each key page, in priority order
+KEY_PAGE_KEYWORDS = (
+    ("about", ("about", "about-us", "who-we-are")),
+    ("services", ("service", "what-we-do", "solutions", "offerings")),
+    ("team", ("team", "people", "staff", "our-team")),
+)
+
+
+def _build_key_page_automaton() -> ahocorasick.Automaton:
+    """Build one automaton over every key page keyword, yielding its page type's rank."""
+    automaton = ahocorasick.Automaton()
+    for rank, (_, keywords) in enumerate(KEY_PAGE_KEYWORDS):
+        for keyword in keywords:
+            # A keyword listed under several page types counts for the first
+            if keyword not in automaton:
+                automaton.add_word(keyword, rank)
+    automaton.make_automaton()
+    return automaton
+
+
+KEY_PAGE_AUTOMATON = _build_key_page_automaton()
+
+
+# Locations worth noting when mentioned on the site
+LOCATION_PATTERNS = [
+    "indiana", "indianapolis", "carmel", "fishers", "noblesville",
+    "bloomington", "fort wayne", "south bend", "evansville",
+    "chicago", "ohio", "kentucky", "michigan", "illinois"
+]
+LOCATION_RE = re.compile(r"\b(" + "|".join(map(re.escape, LOCATION_PATTERNS)) + r")\b")
+
+
+def _netloc(url: str) -> str:
+    """Get a URL's netloc, slicing absolute http(s) URLs directly instead of urlparse."""
+    if url.startswith("https://"):
+        start = 8
+    elif url.startswith("http://"):
+        start = 7
+    else:
+        return urlparse(url).netloc
+
+    end = len(url)
+    for sep in "/?#":
+        i = url.find(sep, start, end)
+        if i != -1:
+            end = i
+    return url[start:end]
+
+
+async def scrape_site(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = 10.0,
+    page: Optional[asyncio.Future] = None
+) -> dict:
     """
     Scrape the target URL and extract relevant business information.
 
@@ -17,6 +74,8 @@ async def scrape_site(url: str, timeout: float = 10.0) -> dict:
     - About page content
     - Team size indicators
     - Location mentions
+
+    If page is given, it's a shared fetch of the main page (see run_all_workers).
     """
     result = {
         "source": "site_scraper",
@@ -36,115 +95,105 @@ async def scrape_site(url: str, timeout: float = 10.0) -> dict:
     }
 
     try:
-        async with httpx.AsyncClient(
-            timeout=timeout,
-            follow_redirects=True,
-            headers={
-                "User-Agent": "Mozilla/5.0 (compatible; HarnessAI/1.0; +https://harnessai.co)"
-            }
-        ) as client:
-            # Fetch main page
-            response = await client.get(url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-
-            # Extract title
-            title_tag = soup.find("title")
-            result["title"] = title_tag.get_text(strip=True) if title_tag else None
-
-            # Extract meta description
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            if meta_desc:
-                result["meta_description"] = meta_desc.get("content", "")
-
-            # Check if likely a JS SPA (minimal content)
-            body = soup.find("body")
-            if body:
-                text_content = body.get_text(separator=" ", strip=True)
-                if len(text_content) < 200:
-                    result["is_spa"] = True
-                result["visible_text"] = text_content[:5000]
-
-            # Extract navigation items
-            nav_items = []
-            for nav in soup.find_all("nav"):
-                for link in nav.find_all("a", href=True):
-                    text = link.get_text(strip=True)
-                    if text and len(text) < 50:
-                        nav_items.append(text)
-            result["navigation_items"] = list(set(nav_items))[:20]
-
-            # Count internal links
-            base_domain = urlparse(url).netloc
-            internal_links = []
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                full_url = urljoin(url, href)
-                if urlparse(full_url).netloc == base_domain:
-                    internal_links.append(full_url)
-            result["internal_links_count"] = len(set(internal_links))
-
-            # Find key pages to scrape (about, services, team)
-            key_pages = {
-                "about": None,
-                "services": None,
-                "team": None,
-            }
-
-            for link in soup.find_all("a", href=True):
-                href = link["href"].lower()
-                text = link.get_text(strip=True).lower()
-                full_url = urljoin(url, link["href"])
-
-                if urlparse(full_url).netloc == base_domain:
-                    if any(kw in href or kw in text for kw in ["about", "about-us", "who-we-are"]):
-                        key_pages["about"] = full_url
-                    elif any(kw in href or kw in text for kw in ["service", "what-we-do", "solutions", "offerings"]):
-                        key_pages["services"] = full_url
-                    elif any(kw in href or kw in text for kw in ["team", "people", "staff", "our-team"]):
-                        key_pages["team"] = full_url
-
-            # Fetch key pages (up to 3)
-            async def fetch_page_content(page_url: str) -> Optional[str]:
-                try:
-                    resp = await client.get(page_url)
-                    resp.raise_for_status()
-                    page_soup = BeautifulSoup(resp.text, "lxml")
-                    main_content = page_soup.find("main") or page_soup.find("article") or page_soup.find("body")
-                    if main_content:
-                        return main_content.get_text(separator=" ", strip=True)[:3000]
-                except Exception:
-                    pass
-                return None
-
-            tasks = []
-            if key_pages["about"]:
-                tasks.append(("about", fetch_page_content(key_pages["about"])))
-            if key_pages["services"]:
-                tasks.append(("services", fetch_page_content(key_pages["services"])))
-            if key_pages["team"]:
-                tasks.append(("team", fetch_page_content(key_pages["team"])))
-
-            if tasks:
-                results = await asyncio.gather(*[t[1] for t in tasks], return_exceptions=True)
-                for i, (page_type, _) in enumerate(tasks):
-                    if not isinstance(results[i], Exception) and results[i]:
-                        result[f"{page_type}_content"] = results[i]
-
-            # Extract location mentions
-            location_patterns = [
-                "indiana", "indianapolis", "carmel", "fishers", "noblesville",
-                "bloomington", "fort wayne", "south bend", "evansville",
-                "chicago", "ohio", "kentucky", "michigan", "illinois"
-            ]
-            text_lower = (result["visible_text"] or "").lower()
-            for pattern in location_patterns:
-                if pattern in text_lower:
-                    result["location_mentions"].append(pattern.title())
-            result["location_mentions"] = list(set(result["location_mentions"]))
-
-            result["success"] = True
+        # Fetch main page (or wait for the shared fetch)
+        response, tree = await get_page(client, url, timeout, page)
+        response.raise_for_status()
+
+        if tree is None:
+            content_type = response.headers.get("content-type", "")
+            result["error"] = f"Not an HTML page ({content_type})"
+            return result
+
+        # Extract title
+        title_tag = tree.css_first("title")
+        result["title"] = title_tag.text(strip=True) if title_tag else None
+
+        # Extract meta description
+        meta_desc = tree.css_first('meta[name="description"]')
+        if meta_desc:
+            result["meta_description"] = meta_desc.attributes.get("content") or ""
+
+        # Check if likely a JS SPA (minimal content)
+        body = tree.body
+        if body:
+            text_content = body.text(separator=" ", strip=True, skip_empty=True)
+            if len(text_content) < 200:
+                result["is_spa"] = True
+            result["visible_text"] = text_content[:5000]
+
+        # Extract navigation items (first 20 distinct, in page order)
+        nav_items = {}
+        for link in tree.css("nav a[href]"):
+            text = link.text(strip=True)
+            if text and len(text) < 50 and text not in nav_items:
+                nav_items[text] = None
+                if len(nav_items) == 20:
+                    break
+        result["navigation_items"] = list(nav_items)
+
+        # Count internal links and find key pages to scrape (about, services, team)
+        # in a single pass over the page's links
+        base_domain = urlparse(url).netloc
+        internal_links = set()
+        key_pages = dict.fromkeys(page_type for page_type, _ in KEY_PAGE_KEYWORDS)
+        pages_left = len(key_pages)
+
+        for link in tree.css("a[href]"):
+            raw_href = link.attributes.get("href") or ""
+            full_url = urljoin(url, raw_href)
+            if _netloc(full_url) != base_domain:
+                continue
+
+            internal_links.add(full_url)
+
+            # The first link matching a page type fills its slot. A link
+            # matching several types counts for the highest-priority one.
+            if pages_left:
+                link_text = f"{raw_href}\n{link.text(strip=True)}".lower()
+                rank = min((rank for _, rank in KEY_PAGE_AUTOMATON.iter(link_text)), default=None)
+                if rank is not None:
+                    page_type = KEY_PAGE_KEYWORDS[rank][0]
+                    if key_pages[page_type] is None:
+                        key_pages[page_type] = full_url
+                        pages_left -= 1
+
+        result["internal_links_count"] = len(internal_links)
+
+        # Fetch key pages (up to 3, one per page type), skipping non-HTML links
+        async def fetch_page_content(page_url: str) -> Optional[str]:
+            try:
+                resp = await fetch_html_page(client, page_url, timeout)
+                if resp is None:
+                    return None
+                page_tree = parse_html(resp.text)
+                main_content = page_tree.css_first("main") or page_tree.css_first("article") or page_tree.body
+                if main_content:
+                    return main_content.text(separator=" ", strip=True, skip_empty=True)[:3000]
+            except Exception:
+                pass
+            return None
+
+        tasks = []
+        if key_pages["about"]:
+            tasks.append(("about", fetch_page_content(key_pages["about"])))
+        if key_pages["services"]:
+            tasks.append(("services", fetch_page_content(key_pages["services"])))
+        if key_pages["team"]:
+            tasks.append(("team", fetch_page_content(key_pages["team"])))
+
+        if tasks:
+            results = await asyncio.gather(*[t[1] for t in tasks], return_exceptions=True)
+            for i, (page_type, _) in enumerate(tasks):
+                if not isinstance(results[i], Exception) and results[i]:
+                    result[f"{page_type}_content"] = results[i]
+
+        # Extract location mentions (whole words, in one scan)
+        text_lower = (result["visible_text"] or "").lower()
+        result["location_mentions"] = sorted({
+            match.group(1).title() for match in LOCATION_RE.finditer(text_lower)
+        })
+
+        result["success"] = True
 
     except httpx.TimeoutException:
         result["error"] = "Timeout - site took too long to respond"
@@ -1,7 +1,12 @@
+import ahocorasick
+import asyncio
+from array import array
 import httpx
-import re
+from selectolax.lexbor import LexborHTMLParser
 from typing import Optional
 
+from app.workers.page import get_page
+
 
 # Simplified Wappalyzer-style technology signatures
 TECH_SIGNATURES = {
@@ -185,49 +190,143 @@ TECH_SIGNATURES = {
 }
 
 
-def check_signature(tech_name: str, signature: dict, headers: dict, html: str, meta_tags: dict) -> Optional[dict]:
-    """Check if a technology signature matches."""
-    confidence = 0
-    matches = []
+# TECH_SIGNATURES flattened once at import into parallel rule lists, each rule
+# pointing back at its tech by index. Rules keep signature order, so evidence
+# for each tech is still collected headers first, then HTML, then meta, and
+# each rule's evidence string is built here rather than on every match.
+TECH_NAMES = list(TECH_SIGNATURES)
+
+# (lowercased name, lowercased value, tech index, evidence)
+HEADER_RULES = [
+    (header_name.lower(), header_value.lower(), tech_idx, f"header:{header_name}")
+    for tech_idx, signature in enumerate(TECH_SIGNATURES.values())
+    for header_name, header_value in signature.get("headers", [])
+]
+
+# (lowercased pattern, tech index, evidence)
+HTML_RULES = [
+    (pattern.lower(), tech_idx, f"html:{pattern[:30]}")
+    for tech_idx, signature in enumerate(TECH_SIGNATURES.values())
+    for pattern in signature.get("html", [])
+]
+
+# (meta name, lowercased value, tech index, evidence)
+META_RULES = [
+    (meta_name, meta_value.lower(), tech_idx, f"meta:{meta_name}")
+    for tech_idx, signature in enumerate(TECH_SIGNATURES.values())
+    for meta_name, meta_value in signature.get("meta", [])
+]
+
+
+# All-zero confidence scores, copied for each page
+NO_CONFIDENCE = array("i", bytes(4 * len(TECH_NAMES)))
+
+
+def _build_html_automaton() -> ahocorasick.Automaton:
+    """Build one automaton over every HTML pattern, yielding the HTML_RULES ids it belongs to."""
+    rule_ids = {}
+    for rule_id, (pattern_lower, _, _) in enumerate(HTML_RULES):
+        # A pattern can appear in several signatures (e.g. "hubspot.com")
+        rule_ids.setdefault(pattern_lower, []).append(rule_id)
+
+    automaton = ahocorasick.Automaton()
+    for pattern_lower, ids in rule_ids.items():
+        automaton.add_word(pattern_lower, tuple(ids))
+    automaton.make_automaton()
+    return automaton
+
+
+HTML_AUTOMATON = _build_html_automaton()
+
+# The page is lowercased and scanned a window at a time. Windows overlap by
+# the longest pattern (less one), so a match split across a boundary is
+# still seen in full by the next window.
+SCAN_WINDOW = 64 * 1024
+SCAN_OVERLAP = max(len(pattern_lower) for pattern_lower, _, _ in HTML_RULES) - 1
+
+
+def find_html_rules(content: bytes) -> list[int]:
+    """
+    Return the ids of the HTML_RULES whose pattern is in the raw page.
+
+    Each rule is reported once however often its pattern occurs, and ids are
+    sorted so evidence keeps signature order. The patterns are all ASCII, so
+    the body is lowercased as bytes and decoded as latin-1 (a 1:1 byte copy)
+    rather than decoded and lowercased as Unicode. Doing that per window
+    keeps the copies small instead of duplicating the whole page.
+    """
+    found = set()
+    for start in range(0, len(content), SCAN_WINDOW):
+        window = content[max(start - SCAN_OVERLAP, 0):start + SCAN_WINDOW]
+        for _, ids in HTML_AUTOMATON.iter(window.lower().decode("latin-1")):
+            found.update(ids)
+    return sorted(found)
+
+
+def match_signatures(headers_lower: dict, html_rule_ids: list[int], meta_tags: dict) -> list[dict]:
+    """
+    Check every technology signature against a page.
+
+    headers_lower maps lowercased header names to lowercased values,
+    html_rule_ids comes from find_html_rules and meta_tags from
+    extract_meta_tags. Returns the matching technologies in signature order.
+    """
+    confidence = array("i", NO_CONFIDENCE)
+    matches = [[] for _ in TECH_NAMES]
 
     # Check headers
-    for header_name, header_value in signature.get("headers", []):
-        header_name_lower = header_name.lower()
-        for h_name, h_value in headers.items():
-            if header_name_lower == h_name.lower():
-                if not header_value or header_value.lower() in h_value.lower():
-                    confidence += 30
-                    matches.append(f"header:{header_name}")
-                    break
-
-    # Check HTML patterns
-    html_lower = html.lower()
-    for pattern in signature.get("html", []):
-        if pattern.lower() in html_lower:
-            confidence += 25
-            matches.append(f"html:{pattern[:30]}")
+    for name_lower, value_lower, tech_idx, evidence in HEADER_RULES:
+        h_value = headers_lower.get(name_lower)
+        if h_value is not None and (not value_lower or value_lower in h_value):
+            confidence[tech_idx] += 30
+            matches[tech_idx].append(evidence)
+
+    # Add the HTML patterns found on the page
+    for rule_id in html_rule_ids:
+        _, tech_idx, evidence = HTML_RULES[rule_id]
+        confidence[tech_idx] += 25
+        matches[tech_idx].append(evidence)
 
     # Check meta tags
-    for meta_name, meta_value in signature.get("meta", []):
-        if meta_name in meta_tags:
-            if not meta_value or meta_value.lower() in meta_tags[meta_name].lower():
-                confidence += 30
-                matches.append(f"meta:{meta_name}")
-
-    if confidence >= 25:
-        return {
+    for meta_name, value_lower, tech_idx, evidence in META_RULES:
+        content = meta_tags.get(meta_name)
+        if content is not None and (not value_lower or value_lower in content):
+            confidence[tech_idx] += 30
+            matches[tech_idx].append(evidence)
+
+    return [
+        {
             "name": tech_name,
-            "confidence": min(confidence, 100),
-            "evidence": matches[:3],
+            "confidence": min(confidence[tech_idx], 100),
+            "evidence": matches[tech_idx][:3],
         }
-    return None
+        for tech_idx, tech_name in enumerate(TECH_NAMES)
+        if confidence[tech_idx] >= 25
+    ]
 
 
-async def detect_technologies(url: str, timeout: float = 10.0) -> dict:
+def extract_meta_tags(tree: LexborHTMLParser) -> dict:
+    """Map lowercased meta tag names to their lowercased content."""
+    meta_tags = {}
+    for meta in tree.css("meta[name]"):
+        name = meta.attributes.get("name")
+        content = meta.attributes.get("content")
+        if name and content is not None:
+            meta_tags[name.lower()] = content.lower()
+    return meta_tags
+
+
+async def detect_technologies(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = 10.0,
+    page: Optional[asyncio.Future] = None
+) -> dict:
     """
     Analyze HTTP response headers and HTML source to detect technologies.
 
     Returns array of detected technologies with confidence levels.
+    If page is given, it's a shared fetch of the main page (see run_all_workers).
     """
     result = {
         "source": "tech_detector",
@@ -238,42 +337,33 @@ async def detect_technologies(url: str, timeout: float = 10.0) -> dict:
     }
 
     try:
-        async with httpx.AsyncClient(
-            timeout=timeout,
-            follow_redirects=True,
-            headers={
-                "User-Agent": "Mozilla/5.0 (compatible; HarnessAI/1.0; +https://harnessai.co)"
-            }
-        ) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-
-            headers = dict(response.headers)
-            html = response.text
-
-            # Extract meta tags
+        response, tree = await get_page(client, url, timeout, page)
+        response.raise_for_status()
+
+        # Lowercase the header values once for every signature's lookups
+        # (httpx already yields lowercased names, with repeated headers joined)
+        headers_lower = {name: value.lower() for name, value in response.headers.items()}
+
+        # Only HTML is parsed (see fetch_parsed_page) and scanned; for anything
+        # else (JSON, images, downloads) the headers are all there is to go on
+        if tree is not None:
+            # Extract meta tags (attributes in any order)
+            meta_tags = extract_meta_tags(tree)
+
+            # Scan the HTML once for every signature's patterns
+            html_rule_ids = find_html_rules(response.content)
+        else:
             meta_tags = {}
-            meta_pattern = re.compile(r'<meta[^>]+name=["\']([^"\']+)["\'][^>]+content=["\']([^"\']*)["\']', re.IGNORECASE)
-            for match in meta_pattern.finditer(html):
-                meta_tags[match.group(1).lower()] = match.group(2)
-
-            # Also check content before name pattern
-            meta_pattern2 = re.compile(r'<meta[^>]+content=["\']([^"\']*)["\'][^>]+name=["\']([^"\']+)["\']', re.IGNORECASE)
-            for match in meta_pattern2.finditer(html):
-                meta_tags[match.group(2).lower()] = match.group(1)
-
-            # Check all signatures
-            detected = []
-            for tech_name, signature in TECH_SIGNATURES.items():
-                match = check_signature(tech_name, signature, headers, html, meta_tags)
-                if match:
-                    detected.append(match)
-
-            # Sort by confidence
-            detected.sort(key=lambda x: x["confidence"], reverse=True)
-
-            result["detected"] = detected
-            result["success"] = True
+            html_rule_ids = []
+
+        # Check all signatures
+        detected = match_signatures(headers_lower, html_rule_ids, meta_tags)
+
+        # Sort by confidence
+        detected.sort(key=lambda x: x["confidence"], reverse=True)
+
+        result["detected"] = detected
+        result["success"] = True
 
     except httpx.TimeoutException:
         result["error"] = "Timeout - site took too long to respond"